@@ -1,51 +1,195 @@
+import os
+import json
+import asyncio
+import logging
 import socket
 import ssl
+import time
+import aiodns
 
-def check_domain_tls13(domain, port=443, timeout=3):
+logger = logging.getLogger(__name__)
+
+# Shared SSL context: the system trust store is loaded only once per process
+_CTX = ssl.create_default_context()
+_CTX.minimum_version = ssl.TLSVersion.TLSv1_3
+
+# In-process DNS cache: {host: (ips, expiry)}
+DNS_CACHE_TTL = 15 * 60
+_dns_cache = {}
+
+async def resolve_host(host, resolver, port=443):
+    """
+    Resolves a host to its IPv4/IPv6 addresses (in resolver order) without
+    blocking the event loop, reusing cached results until they expire.
+    Raises aiodns.error.DNSError if resolution fails.
+    """
+    cached = _dns_cache.get(host)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    result = await resolver.getaddrinfo(host, socket.AF_UNSPEC, port=port, type=socket.SOCK_STREAM)
+    ips = list(dict.fromkeys(node.addr[0].decode() for node in result.nodes))
+    _dns_cache[host] = (ips, time.monotonic() + DNS_CACHE_TTL)
+    return ips
+
+# On-disk cache of successful checks: {domain: last_ok_timestamp}
+# TLS 1.3 support rarely changes, so fresh entries skip re-probing across rotations
+TLS_CACHE_TTL = 24 * 60 * 60
+_cache_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.tls13_cache.json')
+
+def _load_tls_cache():
+    try:
+        with open(_cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+_tls_cache = _load_tls_cache()
+
+def _is_cached_ok(domain):
+    last_ok = _tls_cache.get(domain)
+    return last_ok is not None and time.time() - last_ok < TLS_CACHE_TTL
+
+def _mark_ok(domain):
+    """
+    Records a successful check and atomically rewrites the cache file.
+    """
+    _tls_cache[domain] = time.time()
+    tmp_path = f"{_cache_path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(_tls_cache, f)
+        os.replace(tmp_path, _cache_path)
+    except OSError as e:
+        logger.warning(f"⚠️ Failed to save TLS cache: {e}")
+
+async def _connect(ips, port, timeout):
+    """
+    Opens a plain TCP connection to the first address that answers, trying them
+    in order like socket.create_connection does. Re-raises the last error if all fail.
+    Returns: the connected transport.
+    """
+    loop = asyncio.get_running_loop()
+    last_error = OSError("No addresses to connect to")
+    for ip in ips:
+        try:
+            transport, _ = await asyncio.wait_for(loop.create_connection(asyncio.Protocol, ip, port), timeout)
+            return transport
+        except (OSError, asyncio.TimeoutError) as e:
+            last_error = e
+    raise last_error
+
+async def _tcp_reachable(ips, port=443, timeout=0.5):
     """
-    Checks if a domain supports TLS 1.3 and is reachable.
+    Cheap pre-check: plain TCP connect without any TLS/crypto work.
+    Returns: True if the host accepted the connection, False otherwise.
+    """
+    try:
+        (await _connect(ips, port, timeout)).close()
+        return True
+    except (OSError, asyncio.TimeoutError):
+        return False
+
+async def check_domain_tls13(domain, ips, port=443, connect_timeout=1, handshake_timeout=2):
+    """
+    Checks if a domain (already resolved to `ips`) supports TLS 1.3 and is reachable.
     Returns: True if successful, False otherwise.
     """
     try:
-        # Create a default SSL context
-        context = ssl.create_default_context()
-        
-        # We want to ensure it connects via TLS 1.3
-        # Note: In modern Python, TLS 1.3 is enabled by default in default_context.
-        # But we check the actual negotiated protocol version.
-        
-        with socket.create_connection((domain, port), timeout=timeout) as sock:
-            with context.wrap_socket(sock, server_hostname=domain) as ssock:
-                version = ssock.version()
-                
-                # Check if negotiated protocol is TLSv1.3
-                if version == 'TLSv1.3':
-                    return True
-                else:
-                    print(f"⚠️ {domain} uses {version}, not TLSv1.3")
-                    return False
+        # The shared context refuses anything below TLS 1.3, so a 1.2-only
+        # server aborts during negotiation instead of completing a full handshake.
+        # Connect by IP, SNI and certificate validation still use the domain name.
+        # asyncio enables TCP_NODELAY on its sockets by default.
+        transport = await _connect(ips, port, connect_timeout)
+        # Separate deadline for the handshake, so a dead host fails fast on connect
+        try:
+            tls_transport = await asyncio.wait_for(
+                asyncio.get_running_loop().start_tls(
+                    transport, transport.get_protocol(), _CTX, server_hostname=domain
+                ),
+                handshake_timeout
+            )
+        except asyncio.TimeoutError:
+            # start_tls closes the raw transport itself on failure
+            logger.warning(f"⚠️ {domain}: TLS handshake timed out")
+            return False
+        tls_transport.close()
+        _mark_ok(domain)
+        return True
                     
-    except socket.timeout:
-        print(f"⚠️ {domain}: Connection timed out")
+    except asyncio.TimeoutError:
+        logger.warning(f"⚠️ {domain}: Connection timed out")
         return False
     except ssl.SSLError as e:
-        print(f"⚠️ {domain}: SSL Error ({e})")
-        return False
-    except socket.gaierror:
-        print(f"⚠️ {domain}: DNS resolution failed")
+        if e.reason in ("TLSV1_ALERT_PROTOCOL_VERSION", "UNSUPPORTED_PROTOCOL"):
+            logger.warning(f"⚠️ {domain}: TLSv1.3 not supported")
+        else:
+            logger.warning(f"⚠️ {domain}: SSL Error ({e})")
         return False
     except ConnectionRefusedError:
-        print(f"⚠️ {domain}: Connection refused")
+        logger.warning(f"⚠️ {domain}: Connection refused")
         return False
     except Exception as e:
-        print(f"⚠️ {domain}: Error {e}")
+        logger.warning(f"⚠️ {domain}: Error {e}")
+        return False
+
+async def probe_domain(domain, resolver, port=443):
+    """
+    Two-stage check: fast TCP reachability first, full TLS 1.3 handshake
+    only for hosts that answered. The domain is resolved once for both stages.
+    A fresh cache entry skips the handshake, but never the live connect.
+    Returns: True if the domain is reachable and supports TLS 1.3.
+    """
+    try:
+        ips = await resolve_host(domain, resolver, port)
+    except aiodns.error.DNSError:
+        logger.warning(f"⚠️ {domain}: DNS resolution failed")
+        return False
+    if not await _tcp_reachable(ips, port):
+        logger.warning(f"⚠️ {domain}: Host unreachable")
         return False
+    if _is_cached_ok(domain):
+        return True
+    return await check_domain_tls13(domain, ips, port)
+
+async def find_tls13_domain(candidates, concurrency=32):
+    """
+    Probes candidates concurrently on a single event loop (at most `concurrency`
+    handshakes in flight) and returns the first domain, in candidate order, that
+    passes, or None. Keeping candidate order preserves the caller's random pick
+    instead of always favouring the fastest (e.g. cached) domain.
+    Remaining probes are cancelled as soon as the winner is known.
+    """
+    resolver = aiodns.DNSResolver()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(domain):
+        async with semaphore:
+            return domain, await probe_domain(domain, resolver)
+
+    tasks = [asyncio.create_task(probe(d)) for d in candidates]
+    try:
+        for task in tasks:
+            domain, ok = await task
+            if ok:
+                return domain
+            logger.info(f"⏩ Skipping {domain} (Validation failed)")
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Drop lookups still pending in pycares, otherwise their callbacks
+        # fire after asyncio.run() has closed the loop
+        resolver.cancel()
+        await resolver.close()
 
 # Self-test block
 if __name__ == "__main__":
     test_domain = "www.google.com"
     print(f"Testing {test_domain}...")
-    if check_domain_tls13(test_domain):
+    if asyncio.run(find_tls13_domain([test_domain])):
         print("✅ TLS 1.3 Supported!")
     else:
         print("❌ TLS 1.3 Failed.")
\ No newline at end of file
@@ -1,7 +1,12 @@
 import os
+import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
@@ -11,24 +16,41 @@ API_TOKEN = os.getenv("PANEL_API_TOKEN")
 INBOUND_ID = int(os.getenv("INBOUND_ID", 1))
 SYNC_INBOUND_IDS = [int(x.strip()) for x in os.getenv("SYNC_INBOUND_IDS", str(INBOUND_ID)).split(",") if x.strip().isdigit()]
 
+# (connect, read) timeouts for every panel request
+PANEL_TIMEOUT = (3, 10)
+
+# Module-scoped session, reused by rotation and sync within the same process
+_session = None
+
 def get_panel_session():
     """
     Initializes a session with the 3x-ui panel using API Token authentication.
     Bypasses CSRF and session cookies entirely.
+    The session is created once and reused, so keep-alive connections to the panel are shared.
     """
+    global _session
+
     if not PANEL_URL or not API_TOKEN:
-        print("❌ Error: PANEL_URL or PANEL_API_TOKEN are missing in .env")
+        logger.error("❌ Error: PANEL_URL or PANEL_API_TOKEN are missing in .env")
         return None
 
+    if _session is not None:
+        return _session
+
     session = requests.Session()
     
+    # Pooled keep-alive connections + retries on transient gateway errors
+    retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    session.mount(PANEL_URL, HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retries))
+    
     # Set up Bearer token authentication as per official API docs
     session.headers.update({
         "Authorization": f"Bearer {API_TOKEN}",
         "Accept": "application/json"
     })
     
-    print("✅ Session initialized with API Token")
+    logger.info("✅ Session initialized with API Token")
+    _session = session
     return session
 
 def get_inbound_data(session):
@@ -36,24 +58,24 @@ def get_inbound_data(session):
     Retrieves the specific inbound data via the official REST API.
     """
     try:
-        res = session.get(f"{PANEL_URL}/panel/api/inbounds/list", timeout=10)
+        res = session.get(f"{PANEL_URL}/panel/api/inbounds/list", timeout=PANEL_TIMEOUT)
         res.raise_for_status()
         
         data = res.json()
         if not data.get('success'):
-            print(f"❌ API failure: {data.get('msg')}")
+            logger.error(f"❌ API failure: {data.get('msg')}")
             return None
             
         inbound_list = data.get('obj',[])
         target = next((i for i in inbound_list if i['id'] == INBOUND_ID), None)
         
         if not target:
-            print(f"❌ Inbound ID {INBOUND_ID} not found")
+            logger.error(f"❌ Inbound ID {INBOUND_ID} not found")
             return None
             
         return target
     except Exception as e:
-        print(f"❌ API error: {e}")
+        logger.error(f"❌ API error: {e}")
         return None
     
 def get_inbounds_data(session):
@@ -61,23 +83,23 @@ def get_inbounds_data(session):
     Retrieves multiple inbounds data via the official REST API based on SYNC_INBOUND_IDS.
     """
     try:
-        res = session.get(f"{PANEL_URL}/panel/api/inbounds/list", timeout=10)
+        res = session.get(f"{PANEL_URL}/panel/api/inbounds/list", timeout=PANEL_TIMEOUT)
         res.raise_for_status()
         
         data = res.json()
         if not data.get('success'):
-            print(f"❌ API failure: {data.get('msg')}")
+            logger.error(f"❌ API failure: {data.get('msg')}")
             return []
             
         inbound_list = data.get('obj', [])
         targets = [i for i in inbound_list if i['id'] in SYNC_INBOUND_IDS]
         
         if not targets:
-            print(f"⚠️ No inbounds found matching IDs: {SYNC_INBOUND_IDS}")
+            logger.warning(f"⚠️ No inbounds found matching IDs: {SYNC_INBOUND_IDS}")
             
         return targets
     except Exception as e:
-        print(f"❌ API error: {e}")
+        logger.error(f"❌ API error: {e}")
         return []
     
 def update_inbound(session, inbound_id, inbound_data):
@@ -87,17 +109,17 @@ def update_inbound(session, inbound_id, inbound_data):
     try:
         update_url = f"{PANEL_URL}/panel/api/inbounds/update/{inbound_id}"
         
-        res = session.post(update_url, json=inbound_data, timeout=10)
+        res = session.post(update_url, json=inbound_data, timeout=PANEL_TIMEOUT)
         res.raise_for_status()
         
         response_json = res.json()
         if response_json.get('success'):
-            print(f"✅ Inbound {inbound_id} updated successfully")
+            logger.info(f"✅ Inbound {inbound_id} updated successfully")
             return True
         else:
-            print(f"❌ Update failed: {response_json.get('msg')}")
+            logger.error(f"❌ Update failed: {response_json.get('msg')}")
             return False
             
     except Exception as e:
-        print(f"❌ Update API error: {e}")
+        logger.error(f"❌ Update API error: {e}")
         return False
\ No newline at end of file
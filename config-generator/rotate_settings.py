@@ -1,28 +1,32 @@
 import os
-import json
-import yaml
-import secrets
+import sys
+import asyncio
+import logging
+import orjson
 import random
+import functools
 import base64
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import x25519
 from dotenv import load_dotenv
 
 # Import our internal modules
 from panel_api import get_panel_session, get_inbound_data, update_inbound
-from domain_tls_checker import check_domain_tls13  # NEW IMPORT
-import sync_configs  # Trigger Gist update
+from domain_tls_checker import find_tls13_domain
 
 # Load environment variables
 load_dotenv()
 
 INBOUND_ID = int(os.getenv("INBOUND_ID", 1))
+TLS_CHECK_CONCURRENCY = 32  # Max simultaneous TLS probes
 
 def generate_x25519_keys():
     """
     Generates X25519 keys using Python 'cryptography'.
     Uses URL-Safe Base64 encoding to be compatible with Xray/Panel.
     """
+    # Imported lazily: cryptography is slow to load and only needed here
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import x25519
+
     # 1. Generate Private Key
     private_key_obj = x25519.X25519PrivateKey.generate()
     
@@ -50,9 +54,24 @@ def generate_x25519_keys():
 
 def generate_short_ids(count=4):
     """
-    Generates a list of random ShortIds.
+    Generates a list of random ShortIds (8 hex chars each).
+    Reads all random bytes in a single call and slices them.
+    """
+    raw = os.urandom(4 * count)
+    return [raw[i * 4:(i + 1) * 4].hex() for i in range(count)]
+
+@functools.lru_cache(maxsize=1)
+def _parse_rotation_domains(file_path, mtime):
     """
-    return [secrets.token_hex(4) for _ in range(count)]
+    Parses the domains YAML file. Cached by (path, mtime), so the file
+    is re-parsed only when it changes.
+    """
+    import yaml
+
+    # Prefer the libyaml C loader when PyYAML is built with it
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=loader)
 
 def load_rotation_domains():
     """
@@ -65,8 +84,9 @@ def load_rotation_domains():
         print("❌ rotation_domains.yaml not found!")
         return []
         
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    domains = _parse_rotation_domains(file_path, os.path.getmtime(file_path))
+    # Return a copy so callers can't mutate the cached list
+    return list(domains) if domains else domains
 
 def rotate():
     print("🔄 Starting Reality rotation process...")
@@ -86,7 +106,7 @@ def rotate():
         raw_stream_settings = inbound.get('streamSettings', {})
         # Check if it's a string from older API version
         was_string = isinstance(raw_stream_settings, str)
-        stream_settings = json.loads(raw_stream_settings) if was_string else raw_stream_settings
+        stream_settings = orjson.loads(raw_stream_settings) if was_string else raw_stream_settings
 
         if stream_settings.get('security') != 'reality':
             print("❌ Error: Inbound is not using Reality security. Aborting.")
@@ -110,29 +130,22 @@ def rotate():
         
     current_root = current_main_sni.replace("www.", "")
     
+    # Strip 'www.' once up front; only the clean domain name is used from here on
+    clean_domains = [d.replace("www.", "") for d in domains]
+    
     # Filter out current domain to ensure change
-    available_domains = [d for d in domains if d.replace("www.", "") != current_root]
+    available_domains = [d for d in clean_domains if d != current_root]
     
     if not available_domains:
         print("⚠️ No other domains available in list. Using current pool.")
-        available_domains = [d for d in domains] # fallback to all domains
+        available_domains = clean_domains # fallback to all domains
 
-    # Shuffle list to pick randomly
-    random.shuffle(available_domains)
-    
-    selected_domain = None
+    # Random order to pick randomly
+    candidates = random.sample(available_domains, k=len(available_domains))
     
     print("🔍 Checking domains for TLS 1.3 support...")
-    for domain in available_domains:
-        # Ensure we check the clean domain name
-        clean_domain = domain.replace("www.", "")
-        
-        # Validate!
-        if check_domain_tls13(clean_domain):
-            selected_domain = clean_domain
-            break # Found a working domain!
-        else:
-            print(f"⏩ Skipping {clean_domain} (Validation failed)")
+    # Probe candidates concurrently, the first one that passes wins
+    selected_domain = asyncio.run(find_tls13_domain(candidates, TLS_CHECK_CONCURRENCY))
             
     if not selected_domain:
         print("❌ CRITICAL: No valid TLS 1.3 domains found in the list! Aborting rotation to preserve connectivity.")
@@ -184,7 +197,7 @@ def rotate():
     
     # Return to original format before sending
     if was_string:
-        inbound['streamSettings'] = json.dumps(stream_settings)
+        inbound['streamSettings'] = orjson.dumps(stream_settings).decode()
     else:
         inbound['streamSettings'] = stream_settings
 
@@ -195,9 +208,12 @@ def rotate():
     if success:
         print("✅ Rotation successful!")
         print("🚀 Triggering config sync...")
+        import sync_configs  # Trigger Gist update (heavy imports, only needed here)
         sync_configs.main()
     else:
         print("❌ Rotation failed.")
 
 if __name__ == "__main__":
+    # Log to stdout like print(), so both share one buffer and stay in order
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
     rotate()
\ No newline at end of file
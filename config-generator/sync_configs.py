@@ -1,5 +1,7 @@
 import os
+import sys
 import json
+import logging
 import yaml
 import requests
 from jinja2 import Environment, FileSystemLoader
@@ -287,4 +289,6 @@ def main():
         print("⚠️ No configs generated")
 
 if __name__ == "__main__":
+    # Log to stdout like print(), so both share one buffer and stay in order
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
     main()
\ No newline at end of file